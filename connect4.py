@@ -1,17 +1,22 @@
+from types import MappingProxyType
 from typing import Optional
+import numpy as np
 import pygame
-
-
-COLOURS = {'red': (255, 0, 0),
-           'orange': (240, 127, 14),
-           'yellow': (255, 255, 0),
-           'lime': (0, 255, 0),
-           'green': (10, 87, 10),
-           'blue': (2, 145, 247),
-           'indigo': (33, 11, 133),
-           'purple': (82, 1, 143),
-           'magenta': (117, 1, 117),
-           'white': (255, 255, 255)}
+import pygame.gfxdraw
+
+
+_COLOUR_ITEMS = (('red', (255, 0, 0)),
+                 ('orange', (240, 127, 14)),
+                 ('yellow', (255, 255, 0)),
+                 ('lime', (0, 255, 0)),
+                 ('green', (10, 87, 10)),
+                 ('blue', (2, 145, 247)),
+                 ('indigo', (33, 11, 133)),
+                 ('purple', (82, 1, 143)),
+                 ('magenta', (117, 1, 117)),
+                 ('white', (255, 255, 255)))
+COLOURS = MappingProxyType(dict(_COLOUR_ITEMS))
+COLOUR_NAMES = tuple(name for name, _ in _COLOUR_ITEMS)
 GRAY = (128, 128, 128)
 BLACK = (0, 0, 0)
 
@@ -23,6 +28,22 @@ ROWS, COLUMNS = 6, 7
 WIDTH = (COIN_RADIUS + 1) * (COLUMNS + 2) * 2
 HEIGHT = (COIN_RADIUS + 1) * (ROWS + 2) * 2
 
+# Random keys for Zobrist hashing, indexed by [player id - 1, col, row]
+ZOBRIST = np.random.default_rng(0xC4).integers(0, 2 ** 63,
+                                               size=(2, COLUMNS, ROWS),
+                                               dtype=np.uint64)
+
+
+def _bb_has_win(bb: int) -> bool:
+    """Return True iff the bitboard bb contains at least 4 connected coins
+    vertically, horizontally or diagonally.
+    """
+    for shift in (1, ROWS + 1, ROWS, ROWS + 2):
+        pairs = bb & (bb >> shift)
+        if pairs & (pairs >> (2 * shift)):
+            return True
+    return False
+
 
 class InvalidValueError(Exception):
     """An error raised when any of selected values for the coin radius or the
@@ -52,23 +73,21 @@ class Coin:
             This x-coordinate corresponds to the center of the coin.
         y_pos: The y-coordinate of this coin on the board visualization.
             This y-coordinate corresponds to the center of the coin.
-        colour: The colour of this coin. If a player has not played this coin,
-            it is a gray coin by default.
+        colour: The id of the player who placed this coin, or 0 if no player
+            has placed this coin yet (a gray coin).
 
     Representation Invariants:
         0 <= row < ROWS
         0 <= col < COLUMNS
         x_pos is a valid coordinate of the visualization.
         y_pos is a valid coordinate of the visualization.
-        colour is a valid tuple representing an RGB colour, i.e. each integer
-            is between 0 and 255 inclusive.
-        colour != (0, 0, 0) (colour is not black)
+        colour in (0, 1, 2)
     """
     row: int
     col: int
     x_pos: int
     y_pos: int
-    colour: tuple[int, int, int]
+    colour: int
     placed: bool
 
     def __init__(self, row: int, column: int, x: int, y: int) -> None:
@@ -86,14 +105,17 @@ class Coin:
         self.col = column
         self.x_pos = x
         self.y_pos = y
-        self.colour = GRAY
+        self.colour = 0
         self.placed = False
 
-    def place(self, colour: tuple[int, int, int]) -> None:
-        """Record that this coin has been placed.
+    def place(self, player_id: int) -> None:
+        """Record that this coin has been placed by the player with player_id.
+
+        Preconditions:
+            player_id in (1, 2)
         """
         self.placed = True
-        self.colour = colour
+        self.colour = player_id
 
 
 class Player:
@@ -101,68 +123,50 @@ class Player:
 
     Attributes:
         name: The name of this player.
+        id_num: The id of this player, which is 1 or 2.
         colour: The colour of this player's coins.
-        _moves: All coin moves made by this player.
+        bb: A bitboard of all coins placed by this player. Each column of the
+            board takes up ROWS + 1 bits, and the coin at (col, row) is stored
+            at bit col * (ROWS + 1) + row. The extra bit per column is always
+            0 so that lines of coins do not wrap around between columns.
 
     Representation Invariants:
+        id_num in (1, 2)
         colour is a valid tuple representing an RGB colour, i.e. each integer
             is between 0 and 255 inclusive.
         colour != (0, 0, 0) (colour is not black)
         colour != (128, 128, 128) (colour is not gray)
-        For every list in _moves, len(_moves) <= 8.
-        Every tuple in moves (including both keys and values) is a valid
-        (col, row) configuration of the Connect4 board.
-
+        bb >= 0
+        Bit col * (ROWS + 1) + ROWS of bb is 0 for every 0 <= col < COLUMNS.
     """
     name: str
+    id_num: int
     colour: tuple[int, int, int]
-    _moves: dict[tuple[int, int], list[tuple[int, int]]]
+    bb: int
 
-    def __init__(self, player_name: str, colour: str) -> None:
+    def __init__(self, player_name: str, id_num: int, colour: str) -> None:
         """Create a new player in a Connect 4 game. This player has initially
         made no moves.
 
         Preconditions:
+            id_num in (1, 2)
             colour is a key in the COLOURS dict.
         """
         self.name = player_name
+        self.id_num = id_num
         self.colour = COLOURS[colour]
-        self._moves = {}
+        self.bb = 0
 
     def place_coin(self, coin: Coin) -> None:
         """Record that self has placed this coin in the board.
         """
-        cx, cy = coin.col, coin.row
-        coin_moves = []
-        for x, y in self._moves:
-            if x in (cx - 1, cx, cx + 1) and y in (cy - 1, cy, cy + 1):
-                self._moves[(x, y)].append((cx, cy))
-                coin_moves.append((x, y))
-        self._moves[(cx, cy)] = coin_moves
-
-    def has_win(self, coin: Coin) -> bool:
-        """Return True iff placing this coin is a win for self. A win means that
-        this coin successfully connects at least 4 of player's coins.
+        self.bb |= 1 << (coin.col * (ROWS + 1) + coin.row)
 
-        Preconditions:
-            coin has already been updated in this player's moves.
+    def has_win(self) -> bool:
+        """Return True iff self has connected at least 4 of their coins
+        vertically, horizontally or diagonally.
         """
-        cx, cy = coin.col, coin.row
-        connected_moves = self._moves[(cx, cy)]
-        for x, y in connected_moves:
-            x_diff, y_diff = x - cx, y - cy
-            length = 2
-            move = (x, y)
-            while (move[0] + x_diff, move[1] + y_diff) in self._moves[move]:
-                length += 1
-                move = (move[0] + x_diff, move[1] + y_diff)
-            move = (cx, cy)
-            while (move[0] - x_diff, move[1] - y_diff) in self._moves[move]:
-                length += 1
-                move = (move[0] - x_diff, move[1] - y_diff)
-            if length >= 53:
-                return True
-        return False
+        return _bb_has_win(self.bb)
 
 
 class Board:
@@ -170,32 +174,60 @@ class Board:
 
     Attributes:
         coins: All coins that are in this board.
-        col_ranges: The pixel ranges of each column in the visualization of this
+        heights: The row of the next free place in each column of this board,
+            or -1 if the column is full.
+        xs: The x-coordinates of the centers of the coins in this board,
+            indexed by [col, row].
+        ys: The y-coordinates of the centers of the coins in this board,
+            indexed by [col, row].
+        colours: The colour of each coin in this board, indexed by [col, row].
+        zkey: The Zobrist hash of the coins placed in this board.
+        tt: A transposition table mapping a zkey to a (value, depth, flag)
+            entry for a searched position.
+        _square: The pixel width of each column in the visualization of this
             board.
 
     Representation Invariants:
         There are COLUMNS lists in coins, with ROWS coins in each of these
             lists. A coin is accessed using coins[col][row], where
             0 <= col <= COLUMNS and 0 <= row < ROWS.
-        Every range in col_ranges is equal. There are exactly COLUMNS ranges,
-            each corresponding to their ordered column in coins.
+        len(heights) == COLUMNS
+        xs.shape == ys.shape == colours.shape == (COLUMNS, ROWS)
+        xs[col, row] == coins[col][row].x_pos and
+            ys[col, row] == coins[col][row].y_pos and
+            colours[col, row] == coins[col][row].colour
+        zkey is the XOR of ZOBRIST[colours[col, row] - 1, col, row] over
+            every placed coin.
+        -1 <= heights[col] < ROWS for every 0 <= col < COLUMNS, and the coins
+            in column col below heights[col] are exactly those placed.
     """
     coins: list[list[Coin]]
-    col_ranges: list[range]
+    heights: list[int]
+    xs: np.ndarray
+    ys: np.ndarray
+    colours: np.ndarray
+    zkey: int
+    tt: dict[int, tuple[int, int, int]]
+    _square: int
 
     def __init__(self) -> None:
         """Initialize a new Connect4 board with no placed coins.
         """
         self.coins = []
-        self.col_ranges = []
-        square = (COIN_RADIUS + 1) * 2
+        self.heights = [ROWS - 1] * COLUMNS
+        self.xs = np.empty((COLUMNS, ROWS), np.int32)
+        self.ys = np.empty((COLUMNS, ROWS), np.int32)
+        self.colours = np.zeros((COLUMNS, ROWS), np.uint8)
+        self.zkey = 0
+        self.tt = {}
+        self._square = square = (COIN_RADIUS + 1) * 2
         for col in range(COLUMNS):
-            col_range = range((col + 1) * square, (col + 2) * square)
-            self.col_ranges.append(col_range)
             column = []
             x = (col + 1) * square + (square // 2)
             for row in range(ROWS):
                 y = (row + 1) * square + (square // 2)
+                self.xs[col, row] = x
+                self.ys[col, row] = y
                 column.append(Coin(row, col, x, y))
             self.coins.append(column)
 
@@ -209,20 +241,17 @@ class Board:
         Preconditions:
             There are spaces available to place a coin.
         """
-        col = 0
-        while col < COLUMNS and pos[0] not in self.col_ranges[col]:
-            col += 1
-        if col == COLUMNS:
+        col = pos[0] // self._square - 1
+        if not 0 <= col < COLUMNS:
             return
-        column = self.coins[col]
-        row = ROWS - 1
-        coin = column[row]
-        while row > -1 and coin.placed:
-            row -= 1
-            coin = column[row]
+        row = self.heights[col]
         if row == -1:
             return
-        coin.place(player.colour)
+        self.heights[col] = row - 1
+        coin = self.coins[col][row]
+        coin.place(player.id_num)
+        self.colours[col, row] = player.id_num
+        self.zkey ^= int(ZOBRIST[player.id_num - 1, col, row])
         player.place_coin(coin)
         return coin
 
@@ -234,15 +263,20 @@ class Connect4:
         board: The board on which the game is played.
         players: The two players playing this game of Connect4.
         screen: The pygame screen on which the board is visualized.
+        _background: A pre-rendered image of this board with no placed coins.
+        _colour_lut: The RGB colour of a coin, indexed by its colour id.
 
     Representation Invariants:
         screen.get_width() / screen.get_height()
             == (COLUMNS + 2) / (ROWS + 2)
         len(players) == 2
+        players[i].id_num == i + 1 for i in (0, 1)
     """
     board: Board
     players: tuple[Player, Player]
     screen: pygame.Surface
+    _background: pygame.Surface
+    _colour_lut: tuple[tuple[int, int, int], ...]
 
     def __init__(self, board: Board, players: tuple[Player, Player],
                  screen: pygame.Surface) -> None:
@@ -251,11 +285,21 @@ class Connect4:
         Preconditions:
             screen.get_width() / screen.get_height()
                 == (COLUMNS + 2) / (ROWS + 2)
-            pygame has been initialized.
+            pygame has been initialized, and screen is the display surface
+                returned by pygame.display.set_mode.
         """
         self.board = board
         self.players = players
         self.screen = screen
+        self._colour_lut = (GRAY, players[0].colour, players[1].colour)
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONUP])
+        self._background = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self._background.fill(BLACK)
+        for x, y in zip(self.board.xs.ravel().tolist(),
+                        self.board.ys.ravel().tolist()):
+            pygame.gfxdraw.filled_circle(self._background, x, y, COIN_RADIUS,
+                                         GRAY)
 
     def play(self) -> None:
         """Play a game of Connect4.
@@ -268,17 +312,23 @@ class Connect4:
         specified, update the entire board.
         """
         if coin:
-            pygame.draw.circle(self.screen, coin.colour,
-                               (coin.x_pos, coin.y_pos), COIN_RADIUS)
+            pygame.gfxdraw.filled_circle(self.screen, coin.x_pos, coin.y_pos,
+                                         COIN_RADIUS,
+                                         self._colour_lut[coin.colour])
+            pygame.display.update(pygame.Rect(coin.x_pos - COIN_RADIUS,
+                                              coin.y_pos - COIN_RADIUS,
+                                              2 * COIN_RADIUS + 1,
+                                              2 * COIN_RADIUS + 1))
         else:
-            pygame.draw.rect(self.screen, BLACK,
-                             (0, 0, self.screen.get_width(),
-                              self.screen.get_height()))
-            for col in self.board.coins:
-                for coin in col:
-                    pygame.draw.circle(self.screen, coin.colour,
-                                       (coin.x_pos, coin.y_pos), COIN_RADIUS)
-        pygame.display.flip()
+            self.screen.blit(self._background, (0, 0))
+            for x, y, colour in zip(self.board.xs.ravel().tolist(),
+                                    self.board.ys.ravel().tolist(),
+                                    self.board.colours.ravel().tolist()):
+                if colour:
+                    pygame.gfxdraw.filled_circle(self.screen, x, y,
+                                                 COIN_RADIUS,
+                                                 self._colour_lut[colour])
+            pygame.display.flip()
 
     def _event_loop(self) -> None:
         """Begin an event loop for player moves in this game of Connect4.
@@ -287,7 +337,7 @@ class Connect4:
         moves_made = 0
         while True:
             player = self.players[cur_player]
-            event = pygame.event.poll()
+            event = pygame.event.wait()
             if event.type == pygame.QUIT:
                 end_message = 'The game has been closed!'
                 break
@@ -295,7 +345,7 @@ class Connect4:
                 coin = self.board.place_coin(player, event.pos)
                 if coin:
                     self._update_board(coin)
-                    if player.has_win(coin):
+                    if player.has_win():
                         end_message = f'Player {player.name} wins the game!'
                         break
                     moves_made += 1
@@ -319,14 +369,14 @@ def get_player(id_num: int, colours: list[str]) -> Player:
         colour = input(f'Please choose a valid colour from '
                        f'\n{colours}: ')
     colours.remove(colour)
-    return Player(name, colour)
+    return Player(name, id_num, colour)
 
 
 if __name__ == '__main__':
     print('~~~~~~ WELCOME TO CONNECT4! ~~~~~~~')
     if not (COIN_RADIUS > 0 and ROWS > 0 and COLUMNS > 0):
         raise InvalidValueError(COIN_RADIUS, ROWS, COLUMNS)
-    available_colours = list(COLOURS.keys())
+    available_colours = list(COLOUR_NAMES)
     game_players = (get_player(1, available_colours),
                     get_player(2, available_colours))
     print('The game has opened...')